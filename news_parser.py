@@ -0,0 +1,16 @@
+# Imported by the feed parser worker processes, so keep this module free of
+# side effects: no environment lookups, database clients or executors.
+import feedparser
+
+
+def parse_news_items(content: bytes):
+    """Parse an RSS document into its top 20 news items"""
+    feed = feedparser.parse(content)
+    news_items = []
+    for entry in feed.entries[:20]:  # Get top 20 news
+        news_items.append({
+            "title": entry.title,
+            "link": entry.link,
+            "published": entry.get("published", "")
+        })
+    return news_items
@@ -1,16 +1,30 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
+from pymongo import ReturnDocument, UpdateOne
+from gridfs.errors import NoFile
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 from typing import List, Optional
 import uuid
+import asyncio
+import base64
+import binascii
+import functools
+import inspect
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import time
 from datetime import datetime
-import feedparser
 import httpx
+import orjson
+from cachetools import TTLCache
+from news_parser import parse_news_items
 
 
 from contextlib import asynccontextmanager
@@ -18,6 +32,13 @@ from contextlib import asynccontextmanager
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
 # MongoDB connection with proper configuration
 mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(
@@ -25,7 +46,11 @@ client = AsyncIOMotorClient(
     serverSelectionTimeoutMS=5000,  # 5 second timeout
     connectTimeoutMS=5000,
     socketTimeoutMS=5000,
-    maxPoolSize=10,
+    maxPoolSize=50,
+    minPoolSize=5,  # Keep warm connections so requests skip the handshake
+    maxIdleTimeMS=30000,
+    waitQueueTimeoutMS=5000,  # Fail fast instead of queueing on a full pool
+    compressors="zlib",  # Base64 image payloads compress well on the wire
     retryWrites=True,
     retryReads=True
 )
@@ -35,6 +60,23 @@ except Exception as e:
     logger.error(f"Failed to connect to MongoDB: {str(e)}")
     raise
 
+# Slide image bytes live in GridFS, slide_images only keeps metadata
+slide_files = AsyncIOMotorGridFSBucket(db, bucket_name="slide_files")
+
+# Shared HTTP client so outbound requests reuse pooled connections
+http_client = httpx.AsyncClient(timeout=5.0, follow_redirects=True)
+
+# feedparser is pure Python; parsing in child processes keeps it off this GIL.
+# forkserver because forking this multi-threaded process (pymongo monitors,
+# Motor's executor) can deadlock the child, and spawn would re-import server.
+def _new_feed_pool():
+    return ProcessPoolExecutor(
+        max_workers=2,
+        mp_context=multiprocessing.get_context("forkserver")
+    )
+
+feed_pool = _new_feed_pool()
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup: Check MongoDB connection
@@ -46,14 +88,31 @@ async def lifespan(app: FastAPI):
         logger.error(f"Failed to connect to MongoDB: {str(e)}")
         raise
     
+    # Index the lookup fields used by every endpoint
+    try:
+        await asyncio.gather(
+            db.app_config.create_index("id", unique=True),
+            db.slide_settings.create_index("id", unique=True),
+            db.current_number.create_index("id", unique=True),
+            db.bluetooth_remote.create_index("id", unique=True),
+            db.voice_settings.create_index("id", unique=True),
+            db.slide_images.create_index("id", unique=True),
+            db.slide_images.create_index("order"),
+            db.content_versions.create_index("id", unique=True),
+        )
+    except Exception as e:
+        logger.error(f"Failed to create indexes: {str(e)}")
+    
     yield
     
-    # Shutdown: Close the MongoDB client
+    # Shutdown: Close the HTTP and MongoDB clients and the feed parser pool
+    await http_client.aclose()
+    feed_pool.shutdown(wait=False, cancel_futures=True)
     client.close()
     logger.info("Closed MongoDB connection")
 
 # Create the main app without a prefix
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -61,7 +120,11 @@ api_router = APIRouter(prefix="/api")
 
 # ============= MODELS =============
 
-class AppConfig(BaseModel):
+class FrozenModel(BaseModel):
+    # Models are never mutated after construction; immutability makes them hashable
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
+class AppConfig(FrozenModel):
     id: str = Field(default="main_config")
     restaurant_name: str = Field(default="Number ONE")
     city: str = Field(default="ROMA")
@@ -74,7 +137,7 @@ class AppConfig(BaseModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
-class AppConfigUpdate(BaseModel):
+class AppConfigUpdate(FrozenModel):
     restaurant_name: Optional[str] = None
     city: Optional[str] = None
     logo_base64: Optional[str] = None
@@ -84,36 +147,37 @@ class AppConfigUpdate(BaseModel):
     rss_feed_url: Optional[str] = None
     weather_api_key: Optional[str] = None
 
-class SlideImage(BaseModel):
+class SlideImage(FrozenModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    image_base64: str
+    image_url: Optional[str] = None
+    image_base64: Optional[str] = None  # Only set on slides stored before GridFS
     order: int = 0
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
-class SlideImageCreate(BaseModel):
+class SlideImageCreate(FrozenModel):
     image_base64: str
     order: Optional[int] = 0
 
-class SlideSettings(BaseModel):
+class SlideSettings(FrozenModel):
     id: str = Field(default="slide_settings")
     interval_seconds: int = Field(default=10)
     transition_effect: str = Field(default="fade")  # fade, slide, zoom
     auto_play: bool = Field(default=True)
 
-class SlideSettingsUpdate(BaseModel):
+class SlideSettingsUpdate(FrozenModel):
     interval_seconds: Optional[int] = None
     transition_effect: Optional[str] = None
     auto_play: Optional[bool] = None
 
-class CurrentNumber(BaseModel):
+class CurrentNumber(FrozenModel):
     id: str = Field(default="current_number")
     number: int = Field(default=1)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
-class NumberUpdate(BaseModel):
+class NumberUpdate(FrozenModel):
     number: int
 
-class BluetoothRemote(BaseModel):
+class BluetoothRemote(FrozenModel):
     id: str = Field(default="bluetooth_remote")
     device_name: Optional[str] = None
     device_id: Optional[str] = None
@@ -123,7 +187,7 @@ class BluetoothRemote(BaseModel):
     button_d_action: str = Field(default="none")
     is_paired: bool = Field(default=False)
 
-class BluetoothRemoteUpdate(BaseModel):
+class BluetoothRemoteUpdate(FrozenModel):
     device_name: Optional[str] = None
     device_id: Optional[str] = None
     button_a_action: Optional[str] = None
@@ -132,7 +196,7 @@ class BluetoothRemoteUpdate(BaseModel):
     button_d_action: Optional[str] = None
     is_paired: Optional[bool] = None
 
-class VoiceSettings(BaseModel):
+class VoiceSettings(FrozenModel):
     id: str = Field(default="voice_settings")
     enabled: bool = Field(default=True)
     voice_type: str = Field(default="female")  # male, female
@@ -141,7 +205,7 @@ class VoiceSettings(BaseModel):
     phrase_template: str = Field(default="Numero {number}")
     language: str = Field(default="it-IT")
 
-class VoiceSettingsUpdate(BaseModel):
+class VoiceSettingsUpdate(FrozenModel):
     enabled: Optional[bool] = None
     voice_type: Optional[str] = None
     pitch: Optional[float] = None
@@ -149,67 +213,267 @@ class VoiceSettingsUpdate(BaseModel):
     phrase_template: Optional[str] = None
     language: Optional[str] = None
 
+_slides_adapter = TypeAdapter(List[SlideImage])
+
+# Fields returned by /slides; image_base64 is only present on pre-GridFS slides
+SLIDE_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "image_url": 1,
+    "image_base64": 1,
+    "order": 1,
+    "created_at": 1,
+}
+
+
+# ============= SINGLETON DOCUMENT CACHE =============
+
+# Singleton documents are read on almost every request, so keep each one
+# in-process for a few seconds instead of round-tripping to MongoDB.
+SINGLETON_CACHE_TTL = 5.0
+
+def _new_cache():
+    return {"value": None, "expires": 0.0, "lock": asyncio.Lock()}
+
+_config_cache = _new_cache()
+_slide_settings_cache = _new_cache()
+_bluetooth_cache = _new_cache()
+_voice_cache = _new_cache()
+
+def _store_cached(cache, value, ttl=SINGLETON_CACHE_TTL):
+    cache["value"] = value
+    cache["expires"] = time.monotonic() + ttl
+
+async def _get_cached(cache, collection, doc_id, ttl=SINGLETON_CACHE_TTL):
+    """Return the singleton document, fetching it at most once per ttl"""
+    if cache["expires"] > time.monotonic():
+        return cache["value"]
+    async with cache["lock"]:
+        # Another request may have refreshed the entry while we waited
+        if cache["expires"] > time.monotonic():
+            return cache["value"]
+        doc = await collection.find_one({"id": doc_id})
+        # Don't cache a miss, the default may be created by another worker
+        if doc is not None:
+            _store_cached(cache, doc, ttl)
+        return doc
+
+async def _create_default(collection, default: BaseModel):
+    """Insert a default singleton unless another request already created it"""
+    doc = default.dict()
+    doc_id = doc.pop("id")
+    return await collection.find_one_and_update(
+        {"id": doc_id},
+        {"$setOnInsert": doc},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+
+async def _get_config_cached(ttl=SINGLETON_CACHE_TTL):
+    return await _get_cached(_config_cache, db.app_config, "main_config", ttl)
+
+
+# ============= HTTP CACHING =============
+
+def cache_control(max_age: int, public: bool = True):
+    """Set a Cache-Control header on the endpoint's response"""
+    header_value = f"{'public' if public else 'private'}, max-age={max_age}"
+
+    def decorator(endpoint):
+        signature = inspect.signature(endpoint)
+        wants_response = "response" in signature.parameters
+
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            response = kwargs["response"] if wants_response else kwargs.pop("response")
+            result = await endpoint(*args, **kwargs)
+            # Endpoints returning a Response bypass the injected one entirely
+            target = result if isinstance(result, Response) else response
+            # An endpoint may opt a response out, e.g. no-store on errors
+            target.headers.setdefault("Cache-Control", header_value)
+            return result
+
+        if not wants_response:
+            # Have FastAPI inject the Response we set the header on
+            parameters = list(signature.parameters.values())
+            parameters.append(inspect.Parameter(
+                "response", inspect.Parameter.KEYWORD_ONLY, annotation=Response
+            ))
+            wrapper.__signature__ = signature.replace(parameters=parameters)
+        return wrapper
+
+    return decorator
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """Check the request's If-None-Match header against an ETag"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+async def _get_version(name: str) -> int:
+    """Get the write counter of a collection, used to build its ETag"""
+    doc = await db.content_versions.find_one({"id": name})
+    return doc.get("version", 0) if doc else 0
+
+def _json_response(content, headers=None) -> Response:
+    """Wrap pre-serialized JSON so FastAPI doesn't encode it a second time"""
+    return Response(content=content, media_type="application/json", headers=headers)
+
+async def _bump_version(name: str):
+    await db.content_versions.update_one(
+        {"id": name},
+        {"$inc": {"version": 1}},
+        upsert=True
+    )
+
 
 # ============= CONFIG ENDPOINTS =============
 
 @api_router.get("/config", response_model=AppConfig)
-async def get_config():
+async def get_config(request: Request):
     """Get app configuration"""
-    config = await db.app_config.find_one({"id": "main_config"})
+    config = await _get_config_cached()
     if not config:
-        # Create default config
-        default_config = AppConfig()
-        await db.app_config.insert_one(default_config.dict())
-        return default_config
-    return AppConfig(**config)
+        # Create default config, stamped with a single timestamp
+        now = datetime.utcnow()
+        config = await _create_default(db.app_config, AppConfig(created_at=now, updated_at=now))
+        _store_cached(_config_cache, config)
+    
+    # The version is bumped on every update, so it identifies the representation
+    etag = f'"config-{config.get("version", 0)}"'
+    # The body holds weather_api_key, so keep it out of shared caches, and
+    # always revalidate so the admin UI sees its own changes immediately
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return _json_response(AppConfig.model_construct(**config).model_dump_json(), headers=headers)
 
 @api_router.put("/config", response_model=AppConfig)
 async def update_config(config_update: AppConfigUpdate):
     """Update app configuration"""
     update_data = {k: v for k, v in config_update.dict().items() if v is not None}
-    update_data["updated_at"] = datetime.utcnow()
+    # Let the server stamp updated_at so it is consistent across workers
+    update = {
+        "$inc": {"version": 1},
+        "$currentDate": {"updated_at": True},
+        # Keep an upserted doc complete so its ETag labels a stable body
+        "$setOnInsert": {"created_at": datetime.utcnow()},
+    }
+    if update_data:
+        update["$set"] = update_data  # An empty $set is rejected by MongoDB
     
-    result = await db.app_config.update_one(
+    config = await db.app_config.find_one_and_update(
         {"id": "main_config"},
-        {"$set": update_data},
-        upsert=True
+        update,
+        upsert=True,
+        return_document=ReturnDocument.AFTER
     )
-    
-    config = await db.app_config.find_one({"id": "main_config"})
+    _store_cached(_config_cache, config)
     return AppConfig(**config)
 
 
 # ============= SLIDE IMAGES ENDPOINTS =============
 
 @api_router.get("/slides", response_model=List[SlideImage])
-async def get_slides():
+@cache_control(max_age=10)
+async def get_slides(request: Request):
     """Get all slide images"""
-    slides = await db.slide_images.find().sort("order", 1).to_list(100)
-    return [SlideImage(**slide) for slide in slides]
+    etag = f'"slides-{await _get_version("slides")}"'
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    slides = await db.slide_images.find({}, SLIDE_PROJECTION).sort("order", 1).to_list(100)
+    # Documents were validated when written, skip re-validating them here
+    slides = [SlideImage.model_construct(**slide) for slide in slides]
+    return _json_response(_slides_adapter.dump_json(slides), headers={"ETag": etag})
+
+def _decode_image(image_base64: str):
+    """Decode a base64 image, optionally given as a data URL"""
+    content_type = "image/jpeg"
+    if image_base64.startswith("data:"):
+        header, _, image_base64 = image_base64.partition(",")
+        content_type = header[5:].split(";")[0].strip().lower() or content_type
+    # Served publicly from the API origin, so never store a non-image type
+    if not content_type.startswith("image/") or content_type == "image/svg+xml":
+        raise HTTPException(status_code=400, detail="Slide must be an image")
+    try:
+        return content_type, base64.b64decode(image_base64, validate=True)
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid base64 image")
 
 @api_router.post("/slides", response_model=SlideImage)
-async def create_slide(slide: SlideImageCreate):
+async def create_slide(slide: SlideImageCreate, request: Request):
     """Create new slide image"""
-    slide_obj = SlideImage(**slide.dict())
-    await db.slide_images.insert_one(slide_obj.dict())
+    content_type, image_bytes = _decode_image(slide.image_base64)
+    slide_id = str(uuid.uuid4())
+    await slide_files.upload_from_stream_with_id(
+        slide_id,
+        slide_id,
+        image_bytes,
+        metadata={"contentType": content_type}
+    )
+    
+    slide_obj = SlideImage(
+        id=slide_id,
+        # Absolute, so clients on other origins can load it as-is
+        image_url=str(request.url_for("get_slide_image", slide_id=slide_id)),
+        order=slide.order or 0
+    )
+    try:
+        await db.slide_images.insert_one(slide_obj.dict(exclude={"image_base64"}))
+    except Exception:
+        # Don't leave an image behind that no slide points to
+        await slide_files.delete(slide_id)
+        raise
+    await _bump_version("slides")
     return slide_obj
 
+@api_router.get("/slides/{slide_id}/image")
+async def get_slide_image(slide_id: str):
+    """Get the image of a slide"""
+    try:
+        grid_out = await slide_files.open_download_stream(slide_id)
+    except NoFile:
+        raise HTTPException(status_code=404, detail="Slide not found")
+    
+    image_bytes = await grid_out.read()
+    content_type = (grid_out.metadata or {}).get("contentType", "image/jpeg")
+    # A slide's image never changes, so clients and CDNs may keep it indefinitely
+    return Response(
+        content=image_bytes,
+        media_type=content_type,
+        headers={
+            "Cache-Control": "public, max-age=31536000, immutable",
+            "X-Content-Type-Options": "nosniff"
+        }
+    )
+
 @api_router.delete("/slides/{slide_id}")
 async def delete_slide(slide_id: str):
     """Delete slide image"""
     result = await db.slide_images.delete_one({"id": slide_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Slide not found")
+    
+    try:
+        await slide_files.delete(slide_id)
+    except NoFile:
+        pass  # Slide stored its image inline
+    await _bump_version("slides")
     return {"message": "Slide deleted successfully"}
 
 @api_router.put("/slides/reorder")
 async def reorder_slides(slide_orders: List[dict]):
     """Reorder slides"""
-    for item in slide_orders:
-        await db.slide_images.update_one(
-            {"id": item["id"]},
-            {"$set": {"order": item["order"]}}
-        )
+    ops = [
+        UpdateOne({"id": item["id"]}, {"$set": {"order": item["order"]}})
+        for item in slide_orders
+    ]
+    if ops:
+        await db.slide_images.bulk_write(ops, ordered=False)
+        await _bump_version("slides")
     return {"message": "Slides reordered successfully"}
 
 
@@ -218,172 +482,178 @@ async def reorder_slides(slide_orders: List[dict]):
 @api_router.get("/slides/settings", response_model=SlideSettings)
 async def get_slide_settings():
     """Get slide settings"""
-    settings = await db.slide_settings.find_one({"id": "slide_settings"})
+    settings = await _get_cached(_slide_settings_cache, db.slide_settings, "slide_settings")
     if not settings:
-        default_settings = SlideSettings()
-        await db.slide_settings.insert_one(default_settings.dict())
-        return default_settings
-    return SlideSettings(**settings)
+        settings = await _create_default(db.slide_settings, SlideSettings())
+        _store_cached(_slide_settings_cache, settings)
+    return _json_response(SlideSettings.model_construct(**settings).model_dump_json())
 
 @api_router.put("/slides/settings", response_model=SlideSettings)
 async def update_slide_settings(settings_update: SlideSettingsUpdate):
     """Update slide settings"""
     update_data = {k: v for k, v in settings_update.dict().items() if v is not None}
     
-    result = await db.slide_settings.update_one(
+    settings = await db.slide_settings.find_one_and_update(
         {"id": "slide_settings"},
         {"$set": update_data},
-        upsert=True
+        upsert=True,
+        return_document=ReturnDocument.AFTER
     )
-    
-    settings = await db.slide_settings.find_one({"id": "slide_settings"})
+    _store_cached(_slide_settings_cache, settings)
     return SlideSettings(**settings)
 
 
 # ============= CURRENT NUMBER ENDPOINTS =============
 
 @api_router.get("/number", response_model=CurrentNumber)
+@cache_control(max_age=5)
 async def get_current_number():
     """Get current serving number"""
     number = await db.current_number.find_one({"id": "current_number"})
     if not number:
-        default_number = CurrentNumber()
-        await db.current_number.insert_one(default_number.dict())
-        return default_number
-    return CurrentNumber(**number)
+        number = await _create_default(db.current_number, CurrentNumber())
+    return _json_response(CurrentNumber.model_construct(**number).model_dump_json())
 
 @api_router.put("/number", response_model=CurrentNumber)
 async def update_number(number_update: NumberUpdate):
     """Update current number"""
-    update_data = {
-        "number": number_update.number,
-        "updated_at": datetime.utcnow()
-    }
-    
-    await db.current_number.update_one(
+    number = await db.current_number.find_one_and_update(
         {"id": "current_number"},
-        {"$set": update_data},
-        upsert=True
+        {"$set": {"number": number_update.number}, "$currentDate": {"updated_at": True}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
     )
-    
-    number = await db.current_number.find_one({"id": "current_number"})
     return CurrentNumber(**number)
 
 @api_router.post("/number/increment", response_model=CurrentNumber)
 async def increment_number():
     """Increment current number by 1"""
-    current = await db.current_number.find_one({"id": "current_number"})
-    if not current:
-        current = CurrentNumber().dict()
-        await db.current_number.insert_one(current)
-    
-    new_number = current.get("number", 1) + 1
-    update_data = {
-        "number": new_number,
-        "updated_at": datetime.utcnow()
-    }
-    
-    await db.current_number.update_one(
+    # Pipeline update so the missing-document default of 1 applies server-side
+    number = await db.current_number.find_one_and_update(
         {"id": "current_number"},
-        {"$set": update_data}
+        [{"$set": {
+            "number": {"$add": [{"$ifNull": ["$number", 1]}, 1]},
+            "updated_at": "$$NOW"
+        }}],
+        upsert=True,
+        return_document=ReturnDocument.AFTER
     )
-    
-    number = await db.current_number.find_one({"id": "current_number"})
     return CurrentNumber(**number)
 
 @api_router.post("/number/decrement", response_model=CurrentNumber)
 async def decrement_number():
     """Decrement current number by 1"""
-    current = await db.current_number.find_one({"id": "current_number"})
-    if not current:
-        current = CurrentNumber().dict()
-        await db.current_number.insert_one(current)
-    
-    new_number = max(1, current.get("number", 1) - 1)  # Don't go below 1
-    update_data = {
-        "number": new_number,
-        "updated_at": datetime.utcnow()
-    }
-    
-    await db.current_number.update_one(
+    number = await db.current_number.find_one_and_update(
         {"id": "current_number"},
-        {"$set": update_data}
+        [{"$set": {
+            # Don't go below 1
+            "number": {"$max": [1, {"$subtract": [{"$ifNull": ["$number", 1]}, 1]}]},
+            "updated_at": "$$NOW"
+        }}],
+        upsert=True,
+        return_document=ReturnDocument.AFTER
     )
-    
-    number = await db.current_number.find_one({"id": "current_number"})
     return CurrentNumber(**number)
 
 @api_router.post("/number/reset", response_model=CurrentNumber)
 async def reset_number():
     """Reset number to 1"""
-    update_data = {
-        "number": 1,
-        "updated_at": datetime.utcnow()
-    }
-    
-    await db.current_number.update_one(
+    number = await db.current_number.find_one_and_update(
         {"id": "current_number"},
-        {"$set": update_data},
-        upsert=True
+        {"$set": {"number": 1}, "$currentDate": {"updated_at": True}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
     )
-    
-    number = await db.current_number.find_one({"id": "current_number"})
     return CurrentNumber(**number)
 
 
 # ============= NEWS FEED ENDPOINT =============
 
+# Parsed feeds keyed by RSS URL; the kiosk polls far more often than feeds change
+_news_cache = TTLCache(maxsize=8, ttl=60)
+
+async def _parse_in_feed_pool(content: bytes):
+    """Parse a feed in feed_pool, rebuilding the pool once if a worker died"""
+    global feed_pool
+    loop = asyncio.get_running_loop()
+    pool = feed_pool
+    try:
+        return await loop.run_in_executor(pool, parse_news_items, content)
+    except BrokenProcessPool:
+        # A broken pool never recovers; replace it unless a concurrent
+        # request already has
+        if feed_pool is pool:
+            logger.warning("Feed parser pool broke, restarting it")
+            pool.shutdown(wait=False, cancel_futures=True)
+            feed_pool = _new_feed_pool()
+        return await loop.run_in_executor(feed_pool, parse_news_items, content)
+
 @api_router.get("/news")
+@cache_control(max_age=60)
 async def get_news_feed():
     """Get news from RSS feed"""
     try:
-        config = await db.app_config.find_one({"id": "main_config"})
+        config = await _get_config_cached()
         rss_url = config.get("rss_feed_url", "https://news.google.com/rss?hl=it&gl=IT&ceid=IT:it") if config else "https://news.google.com/rss?hl=it&gl=IT&ceid=IT:it"
         
-        # Parse RSS feed
-        feed = feedparser.parse(rss_url)
+        cached = _news_cache.get(rss_url)
+        if cached is not None:
+            return cached
         
-        news_items = []
-        for entry in feed.entries[:20]:  # Get top 20 news
-            news_items.append({
-                "title": entry.title,
-                "link": entry.link,
-                "published": entry.get("published", "")
-            })
+        # Fetch without blocking the event loop, then parse in another process
+        resp = await http_client.get(rss_url)
+        resp.raise_for_status()
+        news_items = await _parse_in_feed_pool(resp.content)
         
-        return {"news": news_items}
+        result = {"news": news_items}
+        _news_cache[rss_url] = result
+        return result
     except Exception as e:
         logger.error(f"Error fetching news: {str(e)}")
-        return {"news": [], "error": str(e)}
+        # Don't let browsers or CDNs hold on to the failure
+        return ORJSONResponse(
+            {"news": [], "error": str(e)},
+            headers={"Cache-Control": "no-store"}
+        )
 
 
 # ============= WEATHER ENDPOINT (MOCKED FOR NOW) =============
 
+# Mock weather data, everything but the city is constant
+_MOCK_WEATHER = {
+    "current": {
+        "temp": 32,
+        "condition": "sunny",
+        "icon": "☀️"
+    },
+    "forecast": [
+        {"day": "GIO", "temp": 35, "condition": "sunny"},
+        {"day": "VEN", "temp": 36, "condition": "sunny"},
+        {"day": "SAB", "temp": 35, "condition": "sunny"},
+        {"day": "DOM", "temp": 35, "condition": "partly_cloudy"},
+        {"day": "LUN", "temp": 35, "condition": "sunny"},
+        {"day": "MAR", "temp": 34, "condition": "sunny"}
+    ]
+}
+_WEATHER_TEMPLATE = orjson.dumps(_MOCK_WEATHER)
+
+# Serialized payload for the last city seen, rebuilt when the city changes
+_weather_cache = {"city": None, "content": b""}
+
+def _weather_content(city: str) -> bytes:
+    if _weather_cache["city"] != city:
+        # Splice the city in front of the pre-serialized constant fields
+        _weather_cache["content"] = b'{"city":' + orjson.dumps(city) + b"," + _WEATHER_TEMPLATE[1:]
+        _weather_cache["city"] = city
+    return _weather_cache["content"]
+
 @api_router.get("/weather")
+@cache_control(max_age=60)
 async def get_weather():
     """Get weather data (mocked for now, will use API later)"""
-    config = await db.app_config.find_one({"id": "main_config"})
+    config = await _get_config_cached()
     city = config.get("city", "ROMA") if config else "ROMA"
-    
-    # Mock weather data
-    mock_weather = {
-        "city": city,
-        "current": {
-            "temp": 32,
-            "condition": "sunny",
-            "icon": "☀️"
-        },
-        "forecast": [
-            {"day": "GIO", "temp": 35, "condition": "sunny"},
-            {"day": "VEN", "temp": 36, "condition": "sunny"},
-            {"day": "SAB", "temp": 35, "condition": "sunny"},
-            {"day": "DOM", "temp": 35, "condition": "partly_cloudy"},
-            {"day": "LUN", "temp": 35, "condition": "sunny"},
-            {"day": "MAR", "temp": 34, "condition": "sunny"}
-        ]
-    }
-    
-    return mock_weather
+    return _json_response(_weather_content(city))
 
 
 # ============= BLUETOOTH REMOTE ENDPOINTS =============
@@ -391,25 +661,24 @@ async def get_weather():
 @api_router.get("/bluetooth", response_model=BluetoothRemote)
 async def get_bluetooth_settings():
     """Get bluetooth remote settings"""
-    settings = await db.bluetooth_remote.find_one({"id": "bluetooth_remote"})
+    settings = await _get_cached(_bluetooth_cache, db.bluetooth_remote, "bluetooth_remote")
     if not settings:
-        default_settings = BluetoothRemote()
-        await db.bluetooth_remote.insert_one(default_settings.dict())
-        return default_settings
-    return BluetoothRemote(**settings)
+        settings = await _create_default(db.bluetooth_remote, BluetoothRemote())
+        _store_cached(_bluetooth_cache, settings)
+    return _json_response(BluetoothRemote.model_construct(**settings).model_dump_json())
 
 @api_router.put("/bluetooth", response_model=BluetoothRemote)
 async def update_bluetooth_settings(settings_update: BluetoothRemoteUpdate):
     """Update bluetooth remote settings"""
     update_data = {k: v for k, v in settings_update.dict().items() if v is not None}
     
-    await db.bluetooth_remote.update_one(
+    settings = await db.bluetooth_remote.find_one_and_update(
         {"id": "bluetooth_remote"},
         {"$set": update_data},
-        upsert=True
+        upsert=True,
+        return_document=ReturnDocument.AFTER
     )
-    
-    settings = await db.bluetooth_remote.find_one({"id": "bluetooth_remote"})
+    _store_cached(_bluetooth_cache, settings)
     return BluetoothRemote(**settings)
 
 
@@ -418,25 +687,24 @@ async def update_bluetooth_settings(settings_update: BluetoothRemoteUpdate):
 @api_router.get("/voice", response_model=VoiceSettings)
 async def get_voice_settings():
     """Get voice/TTS settings"""
-    settings = await db.voice_settings.find_one({"id": "voice_settings"})
+    settings = await _get_cached(_voice_cache, db.voice_settings, "voice_settings")
     if not settings:
-        default_settings = VoiceSettings()
-        await db.voice_settings.insert_one(default_settings.dict())
-        return default_settings
-    return VoiceSettings(**settings)
+        settings = await _create_default(db.voice_settings, VoiceSettings())
+        _store_cached(_voice_cache, settings)
+    return _json_response(VoiceSettings.model_construct(**settings).model_dump_json())
 
 @api_router.put("/voice", response_model=VoiceSettings)
 async def update_voice_settings(settings_update: VoiceSettingsUpdate):
     """Update voice/TTS settings"""
     update_data = {k: v for k, v in settings_update.dict().items() if v is not None}
     
-    await db.voice_settings.update_one(
+    settings = await db.voice_settings.find_one_and_update(
         {"id": "voice_settings"},
         {"$set": update_data},
-        upsert=True
+        upsert=True,
+        return_document=ReturnDocument.AFTER
     )
-    
-    settings = await db.voice_settings.find_one({"id": "voice_settings"})
+    _store_cached(_voice_cache, settings)
     return VoiceSettings(**settings)
 
 
@@ -450,10 +718,3 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)